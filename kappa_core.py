@@ -0,0 +1,820 @@
+"""
+Kappa simulation core
+
+Runs Kappa models with kappybara and formats the sampled observables as
+CSV. Everything here is independent of the MCP server in main.py, which
+wraps it as tools; caches, the kappybara import, the batch worker pool
+and the JIT-compiled helpers live here once per process.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+import base64
+import contextlib
+import copy
+import functools
+import gzip
+import hashlib
+import io
+import os
+import threading
+import time
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    # Numba is optional; without it the jitted helpers run as plain Python
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+# Importing kappybara takes a noticeable time (lark, pandas, matplotlib), so
+# it starts in the background as soon as this module loads rather than on
+# the first simulation; _load_kappybara() waits for it to finish
+_kappybara_ready = threading.Event()
+_kappybara_system = None
+_kappybara_error: Optional[Exception] = None
+
+
+def _preload_kappybara() -> None:
+    """Import kappybara's System class, recording why if it fails."""
+    global _kappybara_system, _kappybara_error
+    try:
+        from kappybara.system import System
+        _kappybara_system = System
+    except Exception as e:
+        # Not only ImportError: e.g. an incompatible pandas or numpy can
+        # break kappybara's import with an AttributeError
+        _kappybara_error = e
+    finally:
+        _kappybara_ready.set()
+
+
+def _load_kappybara():
+    """
+    Return kappybara's System class once the background import is done.
+
+    Raises:
+        ImportError: If kappybara could not be imported, for whatever reason
+    """
+    _kappybara_ready.wait()
+    error = _kappybara_error
+    if isinstance(error, ImportError):
+        raise ImportError(str(error)) from error
+    if error is not None:
+        raise ImportError(f"{type(error).__name__}: {error}") from error
+    return _kappybara_system
+
+
+threading.Thread(
+    target=_preload_kappybara, name="kappybara-preload", daemon=True
+).start()
+
+# Simulation methods accepted by simulate
+SIMULATION_METHODS = ("ssa", "tau-leap")
+
+# Default wall-clock budget for one simulation, in seconds
+MAX_WALL_SECONDS = 300.0
+
+# The SSA loop checks the clock once every this many + 1 events
+DEADLINE_CHECK_MASK = 0x3FF
+
+# Encodings of the 'output' field accepted by simulate
+OUTPUT_ENCODINGS = ("csv", "gzip+base64")
+
+# Level 1 compresses several times faster than the default, and numeric
+# CSV still shrinks well
+OUTPUT_GZIP_LEVEL = 1
+
+# Bound on the relative change of any rule's propensity within one leap
+# (the epsilon of the Cao-Gillespie-Petzold step-size selector)
+TAU_LEAP_EPSILON = 0.03
+
+# Leaps expected to fire fewer events than this are not worth taking;
+# run this many exact SSA steps instead
+SSA_FALLBACK_EVENTS = 10.0
+SSA_FALLBACK_STEPS = 100
+
+# Worker pool for batch runs, one process per core, shared by all calls
+# once started
+BATCH_WORKERS = os.cpu_count() or 1
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# Models registered with register_model, by model id, least recently
+# used first
+MODEL_CACHE_SIZE = 32
+_models: "OrderedDict[str, str]" = OrderedDict()
+_models_lock = threading.Lock()
+
+
+class _Discard(io.TextIOBase):
+    """A text stream that drops everything written to it."""
+
+    def write(self, text: str) -> int:
+        return len(text)
+
+
+_DISCARD = _Discard()
+
+
+class _Sampler:
+    """
+    Record a system's observables at `points` evenly spaced output times.
+
+    Detaches the system's monitor so update() no longer records a row per
+    event; record() instead evaluates the observables once per output time
+    the simulation has reached. Rows go into a buffer allocated once at its
+    final size, as int32 since observables are normally copy numbers; the
+    buffer is widened to int64 for larger integers, or to float64 for values
+    that are not integers at all (or not finite).
+    """
+
+    def __init__(self, system, time_limit: float, points: int):
+        self.system = system
+        system.monitor = None
+
+        self.names = list(system.observables)
+        self.times = np.linspace(0.0, time_limit, points)
+        self.data = np.empty((points, len(self.names)), dtype=np.int32)
+        self.next = 0
+        self.record()
+
+    def record(self) -> None:
+        """
+        Record a row for every output time up to the current time.
+
+        In SSA, call this before applying the event that ends at the current
+        time: the output times it has passed saw the state it started from.
+        """
+        system = self.system
+        times = self.times
+        while self.next < len(times) and times[self.next] <= system.time:
+            values = np.array([system[name] for name in self.names], dtype=np.float64)
+            self._widen(values)
+            self.data[self.next] = values
+            self.next += 1
+
+    def _widen(self, values: np.ndarray) -> None:
+        """Widen the buffer's dtype as needed to hold `values` exactly."""
+        dtype = self.data.dtype
+        if dtype == np.float64:
+            return
+        if not (np.all(np.isfinite(values)) and np.array_equal(values, np.rint(values))):
+            dtype = np.float64
+        else:
+            largest = np.abs(values).max(initial=0.0)
+            # 2.0 ** 63 itself rounds to int64's maximum plus one
+            if largest >= 2.0 ** 63:
+                dtype = np.float64
+            elif largest > np.iinfo(dtype).max:
+                dtype = np.int64
+        if dtype != self.data.dtype:
+            self.data = self.data.astype(dtype)
+
+    def deduplicate(self) -> None:
+        """
+        Drop each recorded row that repeats the row before it.
+
+        The trajectory is a step function, so every kept row holds until
+        the next one; the last row is always kept to mark where it ends.
+        """
+        n = self.next
+        if n < 3:
+            return
+        data = self.data[:n]
+        keep = np.ones(n, dtype=bool)
+        keep[1:-1] = np.any(data[1:-1] != data[:-2], axis=1)
+        self.times = self.times[:n][keep]
+        self.data = data[keep]
+        self.next = len(self.times)
+
+    def to_csv(self) -> str:
+        """Format the recorded rows as CSV, with a leading time column."""
+        header = ",".join(["time"] + self.names)
+        times = self.times[:self.next]
+        data = self.data[:self.next]
+
+        if HAVE_NUMBA and data.dtype == np.int32:
+            stamps = [repr(t).encode() for t in times.tolist()]
+            prefixes = np.frombuffer(b"".join(stamps), dtype=np.uint8)
+            offsets = np.zeros(len(stamps) + 1, dtype=np.int64)
+            np.cumsum([len(stamp) for stamp in stamps], out=offsets[1:])
+            out = np.empty(
+                len(prefixes) + len(stamps) * (data.shape[1] * CSV_CELL_BYTES + 1),
+                dtype=np.uint8
+            )
+            n = _format_csv_rows(prefixes, offsets, data, out)
+            return header + "\n" + out[:n].tobytes().decode("ascii")
+
+        fmt = "%s" if data.dtype == np.float64 else "%d"
+        buffer = io.StringIO()
+        np.savetxt(
+            buffer,
+            np.column_stack([times, data]),
+            fmt=["%s"] + [fmt] * len(self.names),
+            delimiter=",",
+            header=header,
+            comments=""
+        )
+        return buffer.getvalue()
+
+
+# Longest CSV cell for an int32 value: a comma, a sign and ten digits
+CSV_CELL_BYTES = 12
+
+
+@njit(cache=True)
+def _format_csv_rows(prefixes, offsets, data, out):
+    """
+    Write one CSV line per row of the int32 array `data` into `out`.
+
+    Line i starts with the already-encoded bytes
+    prefixes[offsets[i]:offsets[i + 1]] (its time stamp), followed by ",v"
+    in decimal for each value. `out` must hold at least len(prefixes) +
+    rows * (columns * CSV_CELL_BYTES + 1) bytes.
+
+    Returns:
+        The number of bytes written
+    """
+    digits = np.empty(10, dtype=np.uint8)
+    pos = 0
+    for i in range(data.shape[0]):
+        for j in range(offsets[i], offsets[i + 1]):
+            out[pos] = prefixes[j]
+            pos += 1
+        for j in range(data.shape[1]):
+            out[pos] = 44  # ','
+            pos += 1
+            value = np.int64(data[i, j])
+            if value < 0:
+                out[pos] = 45  # '-'
+                pos += 1
+                value = -value
+            n = 0
+            while True:
+                digits[n] = 48 + value % 10
+                n += 1
+                value //= 10
+                if value == 0:
+                    break
+            while n > 0:
+                n -= 1
+                out[pos] = digits[n]
+                pos += 1
+        out[pos] = 10  # '\n'
+        pos += 1
+    return pos
+
+
+def _ssa_step(system, time_limit: float, sampler: _Sampler) -> None:
+    """
+    Fire one reaction event, in the order of System.update().
+
+    The output times passed while waiting for the event are recorded before
+    it fires, since the state they saw is the one it started from. An event
+    that would land past `time_limit` is not fired at all.
+    """
+    system.wait()
+    sampler.record()
+    if system.time < time_limit:
+        rule = system.choose_rule()
+        if rule is not None:
+            system.apply_rule(rule)
+
+
+def _run_ssa(
+    system, time_limit: float, sampler: _Sampler, deadline: float
+) -> bool:
+    """
+    Advance the system to `time_limit` one reaction event at a time.
+
+    Returns:
+        False if the time.monotonic() `deadline` passed first
+    """
+    steps = 0
+    while system.time < time_limit:
+        # Checked before the first event too, in case building the model
+        # already used up the budget
+        if steps & DEADLINE_CHECK_MASK == 0 and time.monotonic() > deadline:
+            return False
+        steps += 1
+
+        # Nothing can fire any more, so the state holds until the end
+        # (kappybara's own wait() would leave the time unchanged forever)
+        if system.reactivity == 0:
+            system.time = time_limit
+            sampler.record()
+            break
+
+        _ssa_step(system, time_limit, sampler)
+    return True
+
+
+@njit(cache=True)
+def _tau_leap_step(embeddings, rates, orders, t, t_end, rng):
+    """
+    Choose one leap and draw how often each rule fires during it.
+
+    Propensities are a_k = c_k * n_k for rate c_k and embedding count n_k.
+    The leap size follows the Cao-Gillespie-Petzold selector. A rule's
+    embeddings are the product of the match counts of its `orders[k]`
+    left-hand components, so n_k ** (1 / orders[k]) serves as its reactant
+    population. Any firing may touch any rule's reactants, so the leap keeps
+    the expected number of events across all rules below
+    max(epsilon * population / order, 1) for every active rule. A draw that
+    fires some rule more often than it has embeddings is rejected, and the
+    leap is halved. Rules of order 0 (creation rules) have no reactants to
+    run out of: they are constant-propensity sources, left out of both the
+    bound and that check. Firing counts are drawn from the numpy Generator
+    `rng`.
+
+    Returns:
+        (tau, firings); tau is 0.0 when the leap would be too short to be
+        worth taking, or when only sources can fire so that nothing bounds
+        it, and the caller should run exact SSA steps instead
+    """
+    d = embeddings.shape[0]
+    propensities = np.empty(d)
+    firings = np.zeros(d, dtype=np.int64)
+    total = 0.0
+    events = np.inf
+    for k in range(d):
+        a = rates[k] * embeddings[k]
+        propensities[k] = a
+        total += a
+        if a > 0.0 and orders[k] > 0.0:
+            population = embeddings[k] ** (1.0 / orders[k])
+            events = min(events, max(TAU_LEAP_EPSILON * population / orders[k], 1.0))
+
+    # Nothing can fire any more, so the state holds until the end
+    if total <= 0.0:
+        return t_end - t, firings
+
+    # With only sources active, one leap could run to the end without the
+    # rules they feed ever getting to act
+    if events < SSA_FALLBACK_EVENTS or events == np.inf:
+        return 0.0, firings
+
+    tau = min(events / total, t_end - t)
+    while True:
+        # Draw every rule's count before checking any, as the NumPy version
+        # does, so both take the same numbers from `rng`
+        for k in range(d):
+            firings[k] = rng.poisson(propensities[k] * tau)
+        accepted = True
+        for k in range(d):
+            if orders[k] > 0.0 and firings[k] > embeddings[k]:
+                accepted = False
+                break
+        if accepted:
+            return tau, firings
+        tau /= 2.0
+
+
+def _tau_leap_step_vectorized(embeddings, rates, orders, t, t_end, rng):
+    """
+    Same as _tau_leap_step, as NumPy broadcasts over all rules at once.
+
+    Used in place of _tau_leap_step when Numba is not installed, where the
+    explicit per-rule loops would run in the interpreter. Both draw the same
+    firings from the same Generator state, rejected leaps included.
+    """
+    propensities = rates * embeddings
+    total = propensities.sum()
+    firings = np.zeros(embeddings.shape[0], dtype=np.int64)
+
+    # Nothing can fire any more, so the state holds until the end
+    if total <= 0.0:
+        return t_end - t, firings
+
+    consumers = orders > 0.0
+    active = (propensities > 0.0) & consumers
+    population = embeddings[active] ** (1.0 / orders[active])
+    events = np.maximum(
+        TAU_LEAP_EPSILON * population / orders[active], 1.0
+    ).min(initial=np.inf)
+    if events < SSA_FALLBACK_EVENTS or events == np.inf:
+        return 0.0, firings
+
+    tau = min(events / total, t_end - t)
+    firings = rng.poisson(propensities * tau)
+    while np.any(firings[consumers] > embeddings[consumers]):
+        tau /= 2.0
+        firings = rng.poisson(propensities * tau)
+    return tau, firings
+
+
+if not HAVE_NUMBA:
+    _tau_leap_step = _tau_leap_step_vectorized
+
+
+def _fire(system, rule) -> bool:
+    """
+    Apply one instance of `rule` during a leap.
+
+    Unlike System.apply_rule this leaves the system's cached rule
+    reactivities in place, so a leap can fire many events and have them
+    recomputed once at the end.
+
+    Returns:
+        False if the rule has no embeddings left to fire on
+    """
+    # Also refreshes the per-component weights select() relies on
+    if rule.n_embeddings(system.mixture) == 0:
+        return False
+
+    update = rule.select(system.mixture)
+    if update is not None:
+        system.tallies[str(rule)]["applied"] += 1
+        system.mixture.apply_update(update)
+    else:
+        system.tallies[str(rule)]["failed"] += 1
+    return True
+
+
+def _run_tau_leap(
+    system,
+    time_limit: float,
+    sampler: _Sampler,
+    rng: np.random.Generator,
+    deadline: float
+) -> bool:
+    """
+    Advance the system to `time_limit` by tau-leaping over its rules.
+
+    Each leap fires a Poisson-distributed number of instances of every rule.
+    A leap that would fire some rule more often than it has embeddings is
+    halved and redrawn; a leap too short to be worth taking falls back to
+    exact SSA steps. No leap runs past the next output time.
+
+    Returns:
+        False if the time.monotonic() `deadline` passed first
+    """
+    rules = list(system.rules.values())
+    d = len(rules)
+    orders = np.array([len(rule.left.components) for rule in rules], dtype=float)
+    # Kappybara divides each rule's embeddings by its symmetry count
+    symmetries = np.array([rule.n_symmetries for rule in rules], dtype=float)
+
+    while system.time < time_limit:
+        # Checked before the first leap too, in case building the model
+        # already used up the budget
+        if time.monotonic() > deadline:
+            return False
+
+        mixture = system.mixture
+        embeddings = np.fromiter(
+            (rule.n_embeddings(mixture) for rule in rules), dtype=float, count=d
+        ) / symmetries
+        rates = np.fromiter(
+            (rule.rate(system) for rule in rules), dtype=float, count=d
+        )
+        # Leaps stop at the next output time, so every row is recorded at
+        # the end of a leap rather than with the state from its start
+        t_end = (
+            sampler.times[sampler.next] if sampler.next < len(sampler.times)
+            else time_limit
+        )
+        tau, firings = _tau_leap_step(
+            embeddings, rates, orders, system.time, t_end, rng
+        )
+
+        if tau == 0.0:
+            for _ in range(SSA_FALLBACK_STEPS):
+                if system.time >= time_limit:
+                    break
+                _ssa_step(system, time_limit, sampler)
+            continue
+
+        for rule, count in zip(rules, firings):
+            for _ in range(count):
+                if not _fire(system, rule):
+                    break
+
+        # The mixture has changed under kappybara's cached reactivities
+        system.__dict__.pop("rule_reactivities", None)
+        # Land exactly on the output time rather than just short of it
+        system.time = t_end if tau >= t_end - system.time else system.time + tau
+        sampler.record()
+    return True
+
+
+class _Model:
+    """
+    A parsed Kappa model, kept apart from its initial mixture.
+
+    Building the %init agents is most of the cost of System.from_ka, and
+    copying a built mixture costs more still, so a model holds only what
+    parsing produces: the rules, observables, variables and the
+    (pattern, count) pairs of its %init declarations. instantiate() then
+    builds each run's System and mixture from scratch.
+    """
+
+    def __init__(self, kappa_code: str):
+        system_class = _load_kappybara()
+        inits = []
+
+        class Template(system_class):
+            def set_mixture(self, mixture):
+                # from_ka fills the new system's mixture with instantiate();
+                # note what it asks for instead of building the agents
+                mixture.instantiate = (
+                    lambda pattern, n_copies=1: inits.append((pattern, n_copies))
+                )
+                super().set_mixture(mixture)
+
+        template = Template.from_ka(kappa_code)
+        self.system_class = system_class
+        self.rules = list(template.rules.values())
+        self.observables = template.observables
+        self.variables = template.variables
+        self.inits = inits
+
+    def instantiate(self):
+        """Return a new System in the model's initial state, unmonitored."""
+        # Rules keep per-mixture state, so each run gets its own copies
+        rules, observables, variables = copy.deepcopy(
+            (self.rules, self.observables, self.variables)
+        )
+        system = self.system_class(
+            None, rules, observables, variables, monitor=False
+        )
+        for pattern, n_copies in self.inits:
+            system.mixture.instantiate(pattern, n_copies)
+        return system
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_kappa(kappa_code: str) -> _Model:
+    """
+    Parse Kappa code into a _Model, cached by source text.
+
+    Repeated simulations of one model (e.g. a sweep over seeds) skip the
+    parser and only build the initial mixture.
+    """
+    return _Model(kappa_code)
+
+
+def register_model(kappa_code: str) -> str:
+    """
+    Parse and remember a model, returning its content-hash model id.
+
+    The most recently used MODEL_CACHE_SIZE models are kept.
+    """
+    _parse_kappa(kappa_code)
+    model_id = hashlib.blake2b(kappa_code.encode(), digest_size=16).hexdigest()
+    with _models_lock:
+        _models[model_id] = kappa_code
+        _models.move_to_end(model_id)
+        while len(_models) > MODEL_CACHE_SIZE:
+            _models.popitem(last=False)
+    return model_id
+
+
+def model_source(kappa_code: str, model_id: Optional[str]) -> str:
+    """
+    Return the Kappa code to simulate: `kappa_code` itself, or the code
+    uploaded as `model_id` when one is given (`kappa_code` is then ignored).
+
+    Raises:
+        ValueError: If neither is given, or no uploaded model has that id
+            (any more)
+    """
+    if model_id is None:
+        if not kappa_code.strip():
+            raise ValueError("No model given; provide kappa_code or model_id")
+        return kappa_code
+    with _models_lock:
+        try:
+            _models.move_to_end(model_id)
+            return _models[model_id]
+        except KeyError:
+            raise ValueError(
+                f"Unknown model_id {model_id!r}; upload the model again with "
+                f"upload_kappa_model"
+            ) from None
+
+
+def simulate(
+    kappa_code: str,
+    time_limit: float = 100.0,
+    points: int = 200,
+    seed: Optional[int] = None,
+    method: str = "ssa",
+    capture_output: bool = False,
+    output_encoding: str = "csv",
+    deduplicate: bool = False,
+    max_wall_seconds: Optional[float] = MAX_WALL_SECONDS
+) -> dict:
+    """
+    Run one Kappa simulation and return the response fields as a dict.
+
+    Args:
+        kappa_code: The Kappa model code to simulate (using kappybara syntax)
+        time_limit: Maximum simulation time
+        points: Number of evenly spaced time points to record
+        seed: Random seed for reproducibility (optional)
+        method: One of SIMULATION_METHODS
+        capture_output: Capture what kappybara prints into 'stdout'/'stderr'
+        output_encoding: One of OUTPUT_ENCODINGS
+        deduplicate: Leave out rows identical to the previous one
+        max_wall_seconds: Real-time budget, or None for no limit
+
+    Returns:
+        Dict with 'stdout', 'stderr' and 'output' (plus 'output_encoding'
+        when the output is not plain CSV); failures are reported in
+        'stderr' rather than raised
+    """
+    # The budget covers parsing and building the initial state too, which
+    # can dominate for large models
+    deadline = (
+        float("inf") if max_wall_seconds is None
+        else time.monotonic() + max_wall_seconds
+    )
+
+    stdout_capture = io.StringIO()
+    stderr_capture = io.StringIO()
+
+    if capture_output:
+        capture_stdout = contextlib.redirect_stdout(stdout_capture)
+        capture_stderr = contextlib.redirect_stderr(stderr_capture)
+    else:
+        # Still keep kappybara's prints off the real stdout, which carries
+        # the MCP protocol under the stdio transport
+        capture_stdout = contextlib.redirect_stdout(_DISCARD)
+        capture_stderr = contextlib.redirect_stderr(_DISCARD)
+
+    try:
+        import random as rand
+
+        if method not in SIMULATION_METHODS:
+            raise ValueError(
+                f"Unknown simulation method {method!r}; "
+                f"expected one of {', '.join(SIMULATION_METHODS)}"
+            )
+        if output_encoding not in OUTPUT_ENCODINGS:
+            raise ValueError(
+                f"Unknown output encoding {output_encoding!r}; "
+                f"expected one of {', '.join(OUTPUT_ENCODINGS)}"
+            )
+
+        # Kappybara samples from the stdlib random module, which can only
+        # be seeded globally
+        if seed is not None:
+            rand.seed(seed)
+
+        # Capture stdout/stderr during simulation if requested
+        with capture_stdout, capture_stderr:
+            # Parse the Kappa code (or reuse a cached parse) and build
+            # this run's initial state from it
+            system = _parse_kappa(kappa_code).instantiate()
+
+            # Record only the requested points rather than every event
+            sampler = _Sampler(system, time_limit, points)
+            # System.update() gives this warning; the runners step the
+            # system themselves
+            system._warn_about_rule_symmetries()
+
+            # Run simulation until we reach the time limit, or run out of
+            # wall-clock budget
+            if method == "tau-leap":
+                # Tau-leaping draws from its own PCG64 stream, so concurrent
+                # simulations never share state. NumPy only takes
+                # non-negative seeds; like random.seed, use the absolute value
+                rng = np.random.default_rng(None if seed is None else abs(seed))
+                finished = _run_tau_leap(system, time_limit, sampler, rng, deadline)
+            else:
+                finished = _run_ssa(system, time_limit, sampler, deadline)
+
+        # Convert the sampled observables to a CSV string
+        if deduplicate:
+            sampler.deduplicate()
+        csv_content = sampler.to_csv()
+
+        response = {
+            "stdout": stdout_capture.getvalue(),
+            "stderr": stderr_capture.getvalue(),
+            "output": csv_content
+        }
+        if not finished:
+            response["stderr"] += (
+                f"Wall-clock budget of {max_wall_seconds} s exceeded at "
+                f"simulation time {system.time}; partial results\n"
+            )
+        if output_encoding == "gzip+base64":
+            compressed = gzip.compress(
+                csv_content.encode(), compresslevel=OUTPUT_GZIP_LEVEL, mtime=0
+            )
+            response["output"] = base64.b64encode(compressed).decode("ascii")
+            response["output_encoding"] = output_encoding
+        return response
+
+    except ImportError as e:
+        error_response = {
+            "stdout": stdout_capture.getvalue(),
+            "stderr": f"Failed to import kappybara: {str(e)}. Please install kappybara: pip install kappybara",
+            "output": ""
+        }
+        return error_response
+    except Exception as e:
+        import traceback
+        error_response = {
+            "stdout": stdout_capture.getvalue(),
+            "stderr": f"Kappybara simulation failed: {str(e)}\n{traceback.format_exc()}",
+            "output": ""
+        }
+        return error_response
+
+
+def _worker_init() -> None:
+    """Import kappybara once per batch worker rather than once per run."""
+    try:
+        _load_kappybara()
+    except ImportError:
+        # Each run reports the import failure in its own response
+        pass
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """Return the batch worker pool, starting it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Never fork workers while the preload thread is mid-import;
+            # forked workers then start with kappybara already loaded
+            _kappybara_ready.wait()
+            _executor = ProcessPoolExecutor(
+                max_workers=BATCH_WORKERS, initializer=_worker_init
+            )
+        return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor) -> None:
+    """Drop a broken worker pool so the next batch starts a fresh one."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def simulate_batch(
+    kappa_code: str,
+    seeds: List[int],
+    time_limit: float = 100.0,
+    points: int = 200,
+    method: str = "ssa",
+    capture_output: bool = False,
+    output_encoding: str = "csv",
+    deduplicate: bool = False,
+    max_wall_seconds: Optional[float] = MAX_WALL_SECONDS
+) -> List[dict]:
+    """
+    Run one replicate of simulate() per seed, in parallel.
+
+    Replicates are spread across a pool of one worker process per CPU core,
+    started on the first batch and kept for later ones. Each worker imports
+    kappybara and parses the model once, then reuses both for every
+    replicate it runs. A single replicate runs in this process instead.
+
+    Returns:
+        One simulate() result per seed, in the order of `seeds`
+    """
+    n = len(seeds)
+    args = (
+        [kappa_code] * n,
+        [time_limit] * n,
+        [points] * n,
+        seeds,
+        [method] * n,
+        [capture_output] * n,
+        [output_encoding] * n,
+        [deduplicate] * n,
+        [max_wall_seconds] * n
+    )
+
+    if n <= 1:
+        # Not worth a round trip through the worker pool
+        results = list(map(simulate, *args))
+    else:
+        executor = _get_executor()
+        workers = min(n, BATCH_WORKERS)
+        try:
+            # Hand out seeds in chunks to cut inter-process round trips
+            results = list(executor.map(
+                simulate, *args, chunksize=max(1, n // (workers * 4))
+            ))
+        except BrokenProcessPool:
+            _discard_executor(executor)
+            raise
+
+    return results
@@ -6,22 +6,55 @@ An MCP server for running Kappa simulations using the Kappybara package.
 Accepts Kappa code as input and returns simulation results as CSV.
 """
 
-from typing import Optional
-import io
+from typing import List, Optional
 import json
-import sys
 
 from fastmcp import FastMCP
 
+from kappa_core import (
+    MAX_WALL_SECONDS,
+    model_source,
+    register_model,
+    simulate,
+    simulate_batch,
+)
+
+try:
+    import orjson
+
+    def _dumps(obj) -> str:
+        """Serialize a response to a JSON string."""
+        try:
+            return orjson.dumps(obj).decode()
+        except orjson.JSONEncodeError:
+            # e.g. a seed beyond 64 bits, which the stdlib encoder handles
+            return json.dumps(obj)
+except ImportError:
+    # orjson is optional; the stdlib encoder produces the same JSON, slower
+    def _dumps(obj) -> str:
+        """Serialize a response to a JSON string."""
+        return json.dumps(obj)
+
 # Initialize the MCP server
 mcp = FastMCP("Kappa Simulator")
 
 
+def _error_response(message: str) -> dict:
+    """Build a response that reports `message` and carries no output."""
+    return {"stdout": "", "stderr": message, "output": ""}
+
+
 def run_kappa_simulation(
     kappa_code: str,
     time_limit: float = 100.0,
     points: int = 200,
-    seed: Optional[int] = None
+    seed: Optional[int] = None,
+    method: str = "ssa",
+    capture_output: bool = False,
+    model_id: Optional[str] = None,
+    output_encoding: str = "csv",
+    deduplicate: bool = False,
+    max_wall_seconds: Optional[float] = MAX_WALL_SECONDS
 ) -> str:
     """
     Run a Kappa simulation using kappybara and return the results.
@@ -31,9 +64,28 @@ def run_kappa_simulation(
         time_limit: Maximum simulation time (default: 100.0)
         points: Number of data points to collect (default: 200)
         seed: Random seed for reproducibility (optional)
+        method: "ssa" for exact stochastic simulation, or "tau-leap" for
+            approximate tau-leaping; each leap still applies its events one
+            by one, so it is only modestly faster, on models with large
+            copy numbers (default: "ssa")
+        capture_output: Capture what kappybara prints into the 'stdout' and
+            'stderr' fields; when False they are left empty apart from error
+            messages (default: False)
+        model_id: Id returned by register_kappa_model; when given, that
+            model is simulated and kappa_code is ignored (optional)
+        output_encoding: "csv" for plain CSV output, or "gzip+base64" to
+            gzip the CSV and base64-encode it, which makes large results
+            much smaller to encode and send (default: "csv")
+        deduplicate: Leave out rows whose observables all equal the previous
+            row's, keeping the last row; each row's values then hold until
+            the next row's time (default: False)
+        max_wall_seconds: Real time the simulation may take; when it runs
+            out, the points recorded so far are returned with a note in
+            'stderr'. None for no limit (default: 300.0)
 
     Returns:
-        JSON string with 'stdout', 'stderr', and 'output' (CSV) fields
+        JSON string with 'stdout', 'stderr', and 'output' (CSV) fields, plus
+        'output_encoding' when the output is not plain CSV
 
     Example:
         ```
@@ -46,96 +98,197 @@ def run_kappa_simulation(
         result = run_kappa_simulation(kappa_code, time_limit=50, points=100)
         ```
     """
-    stdout_capture = io.StringIO()
-    stderr_capture = io.StringIO()
-
     try:
-        from kappybara.system import System
-        import random as rand
+        kappa_code = model_source(kappa_code, model_id)
+    except ValueError as e:
+        return _dumps(_error_response(str(e)))
 
-        # Set random seed if provided
-        if seed is not None:
-            rand.seed(seed)
+    return _dumps(
+        simulate(
+            kappa_code, time_limit, points, seed, method, capture_output,
+            output_encoding, deduplicate, max_wall_seconds
+        )
+    )
 
-        # Capture stdout/stderr during simulation
-        old_stdout = sys.stdout
-        old_stderr = sys.stderr
-        sys.stdout = stdout_capture
-        sys.stderr = stderr_capture
 
-        try:
-            # Parse and create the system from Kappa code
-            system = System.from_ka(kappa_code)
+def register_kappa_model(kappa_code: str) -> str:
+    """
+    Parse a Kappa model once so later simulations can refer to it by id.
 
-            # The monitor is automatically created with the system
-            # and tracks observables as we run update()
+    The id is a hash of the code, so uploading the same model twice gives
+    the same id. The most recent kappa_core.MODEL_CACHE_SIZE models are
+    kept.
+
+    Args:
+        kappa_code: The Kappa model code (using kappybara syntax)
 
-            # Run simulation until we reach the time limit
-            while system.time < time_limit:
-                system.update()
+    Returns:
+        JSON string with 'model_id' (empty if parsing failed) and 'stderr'
+    """
+    try:
+        model_id = register_model(kappa_code)
+    except ImportError as e:
+        return _dumps({
+            "model_id": "",
+            "stderr": f"Failed to import kappybara: {str(e)}. Please install kappybara: pip install kappybara"
+        })
+    except Exception as e:
+        return _dumps({"model_id": "", "stderr": f"Failed to parse Kappa model: {str(e)}"})
+    return _dumps({"model_id": model_id, "stderr": ""})
 
-        finally:
-            # Restore stdout/stderr
-            sys.stdout = old_stdout
-            sys.stderr = old_stderr
 
-        # Get the data from monitor as a dataframe
-        df = system.monitor.dataframe
+def run_kappa_simulation_batch(
+    kappa_code: str,
+    seeds: List[int],
+    time_limit: float = 100.0,
+    points: int = 200,
+    method: str = "ssa",
+    capture_output: bool = False,
+    model_id: Optional[str] = None,
+    output_encoding: str = "csv",
+    deduplicate: bool = False,
+    max_wall_seconds: Optional[float] = MAX_WALL_SECONDS
+) -> str:
+    """
+    Run one replicate of a Kappa simulation per seed, in parallel.
 
-        # Convert to CSV string
-        csv_buffer = io.StringIO()
-        df.to_csv(csv_buffer, index=False)
-        csv_content = csv_buffer.getvalue()
+    Replicates are spread across one worker process per CPU core; see
+    kappa_core.simulate_batch.
 
-        response = {
-            "stdout": stdout_capture.getvalue(),
-            "stderr": stderr_capture.getvalue(),
-            "output": csv_content
-        }
-        return json.dumps(response)
+    Args:
+        kappa_code: The Kappa model code to simulate (using kappybara syntax)
+        seeds: Random seeds, one per replicate
+        time_limit: Maximum simulation time (default: 100.0)
+        points: Number of data points to collect (default: 200)
+        method: "ssa" or "tau-leap", as for run_kappa_simulation (default: "ssa")
+        capture_output: Capture kappybara's stdout/stderr for each replicate
+            (default: False)
+        model_id: Id returned by register_kappa_model; when given, that
+            model is simulated and kappa_code is ignored (optional)
+        output_encoding: "csv" or "gzip+base64", as for run_kappa_simulation
+            (default: "csv")
+        deduplicate: Leave out repeated rows, as for run_kappa_simulation
+            (default: False)
+        max_wall_seconds: Real time each replicate may take, as for
+            run_kappa_simulation (default: 300.0)
 
-    except ImportError as e:
-        sys.stdout = sys.__stdout__
-        sys.stderr = sys.__stderr__
-        error_response = {
-            "stdout": stdout_capture.getvalue(),
-            "stderr": f"Failed to import kappybara: {str(e)}. Please install kappybara: pip install kappybara",
-            "output": ""
-        }
-        return json.dumps(error_response)
-    except Exception as e:
-        import traceback
-        sys.stdout = sys.__stdout__
-        sys.stderr = sys.__stderr__
-        error_response = {
-            "stdout": stdout_capture.getvalue(),
-            "stderr": f"Kappybara simulation failed: {str(e)}\n{traceback.format_exc()}",
-            "output": ""
-        }
-        return json.dumps(error_response)
+    Returns:
+        JSON string with a 'runs' list holding, for each seed in order,
+        its 'seed' and the 'stdout', 'stderr', and 'output' fields
+    """
+    try:
+        kappa_code = model_source(kappa_code, model_id)
+    except ValueError as e:
+        error = _error_response(str(e))
+        return _dumps({"runs": [{"seed": seed, **error} for seed in seeds]})
+
+    runs = [
+        {"seed": seed, **result}
+        for seed, result in zip(seeds, simulate_batch(
+            kappa_code, seeds, time_limit, points, method, capture_output,
+            output_encoding, deduplicate, max_wall_seconds
+        ))
+    ]
+    return _dumps({"runs": runs})
 
 
 # Register the MCP tool
 @mcp.tool()
 def kappa_simulation(
-    kappa_code: str,
+    kappa_code: str = "",
     time_limit: float = 100.0,
     points: int = 200,
-    seed: Optional[int] = None
+    seed: Optional[int] = None,
+    method: str = "ssa",
+    capture_output: bool = False,
+    model_id: Optional[str] = None,
+    output_encoding: str = "csv",
+    deduplicate: bool = False,
+    max_wall_seconds: Optional[float] = MAX_WALL_SECONDS
 ) -> str:
     """
     Run a Kappa simulation and return the results.
 
     Args:
-        kappa_code: The Kappa model code to simulate
+        kappa_code: The Kappa model code to simulate; required unless
+            model_id is given
         time_limit: Maximum simulation time (default: 100.0)
         points: Number of data points to collect (default: 200)
         seed: Random seed for reproducibility (optional)
+        method: "ssa" (exact) or "tau-leap" (approximate, somewhat faster on
+            large copy numbers) (default: "ssa")
+        capture_output: Capture the simulator's stdout/stderr (default: False)
+        model_id: Id from upload_kappa_model, to skip resending and reparsing
+            the model; kappa_code is ignored when it is given (optional)
+        output_encoding: "csv" (default) or "gzip+base64" for compressed output
+        deduplicate: Leave out rows identical to the previous one (default: False)
+        max_wall_seconds: Real-time budget; partial results are returned when
+            it runs out (default: 300.0)
+
+    Returns:
+        JSON string with 'stdout', 'stderr', and 'output' fields
+    """
+    return run_kappa_simulation(
+        kappa_code, time_limit, points, seed, method, capture_output, model_id,
+        output_encoding, deduplicate, max_wall_seconds
+    )
+
+
+@mcp.tool()
+def kappa_simulation_batch(
+    seeds: List[int],
+    kappa_code: str = "",
+    time_limit: float = 100.0,
+    points: int = 200,
+    method: str = "ssa",
+    capture_output: bool = False,
+    model_id: Optional[str] = None,
+    output_encoding: str = "csv",
+    deduplicate: bool = False,
+    max_wall_seconds: Optional[float] = MAX_WALL_SECONDS
+) -> str:
+    """
+    Run many replicates of a Kappa simulation, one per seed, in parallel.
+
+    Args:
+        seeds: Random seeds, one per replicate
+        kappa_code: The Kappa model code to simulate; required unless
+            model_id is given
+        time_limit: Maximum simulation time (default: 100.0)
+        points: Number of data points to collect (default: 200)
+        method: "ssa" (exact) or "tau-leap" (approximate, somewhat faster on
+            large copy numbers) (default: "ssa")
+        capture_output: Capture the simulator's stdout/stderr (default: False)
+        model_id: Id from upload_kappa_model, to skip resending the model;
+            kappa_code is ignored when it is given (optional)
+        output_encoding: "csv" (default) or "gzip+base64" for compressed output
+        deduplicate: Leave out rows identical to the previous one (default: False)
+        max_wall_seconds: Real-time budget per replicate (default: 300.0)
+
+    Returns:
+        JSON string with a 'runs' list of {'seed', 'stdout', 'stderr', 'output'}
+    """
+    return run_kappa_simulation_batch(
+        kappa_code, seeds, time_limit, points, method, capture_output, model_id,
+        output_encoding, deduplicate, max_wall_seconds
+    )
+
+
+@mcp.tool()
+def upload_kappa_model(kappa_code: str) -> str:
+    """
+    Parse a Kappa model once and get an id to simulate it by.
+
+    Pass the returned model_id to kappa_simulation or kappa_simulation_batch
+    instead of kappa_code to skip resending and reparsing the model.
+
+    Args:
+        kappa_code: The Kappa model code
 
     Returns:
-        JSON string with 'stdout', 'stderr', and 'output' (CSV) fields
+        JSON string with 'model_id' (empty on failure) and 'stderr' fields
     """
-    return run_kappa_simulation(kappa_code, time_limit, points, seed)
+    return register_kappa_model(kappa_code)
 
 
 @mcp.resource("kappa://examples/simple")
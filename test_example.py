@@ -7,7 +7,11 @@ without going through the MCP protocol (useful for testing).
 """
 
 import json
-from main import run_kappa_simulation
+from main import (
+    register_kappa_model,
+    run_kappa_simulation,
+    run_kappa_simulation_batch,
+)
 
 
 def print_result(result_json: str, title: str):
@@ -79,8 +83,98 @@ M(l[.], r[.]), M(l[.], r[.]) -> M(l[.], r[1]), M(l[1], r[.]) @ 0.01
     print_result(result, "Example 2: Linear Polymerization")
 
 
+def example_tau_leap():
+    """Example 3: Reversible binding with approximate tau-leaping"""
+    kappa_code = """
+%init: 1000 A(x[.])
+%init: 1000 B(x[.])
+
+%obs: 'AB_complex' |A(x[1]), B(x[1])|
+
+A(x[.]), B(x[.]) <-> A(x[1]), B(x[1]) @ 0.01, 1
+"""
+
+    result = run_kappa_simulation(
+        kappa_code=kappa_code,
+        time_limit=10.0,
+        points=20,
+        seed=42,
+        method="tau-leap"
+    )
+
+    print_result(result, "Example 3: Tau-Leaping")
+
+
+def example_tau_leap_birth_death():
+    """Example 4: Tau-leaping a model that starts empty and is fed by creation"""
+    kappa_code = """
+%init: 0 A(x[.])
+
+%obs: 'A' |A(x[.])|
+
+. -> A(x[.]) @ 100
+A(x[.]) -> . @ 1
+"""
+
+    result = run_kappa_simulation(
+        kappa_code=kappa_code,
+        time_limit=20.0,
+        points=5,
+        seed=3,
+        method="tau-leap"
+    )
+
+    print_result(result, "Example 4: Tau-Leaping with Creation")
+
+
+def example_batch():
+    """Example 5: Several replicates of reversible binding in parallel"""
+    kappa_code = """
+%init: 10 A(x[.])
+%init: 10 B(x[.])
+
+%obs: 'AB_complex' |A(x[1]), B(x[1])|
+
+A(x[.]), B(x[.]) <-> A(x[1]), B(x[1]) @ 1, 1
+"""
+
+    result = json.loads(run_kappa_simulation_batch(
+        kappa_code=kappa_code,
+        seeds=[1, 2, 3, 4],
+        time_limit=2.0,
+        points=20
+    ))
+
+    for run in result["runs"]:
+        print_result(json.dumps(run), f"Example 5: Batch (seed {run['seed']})")
+
+
+def example_uploaded_model():
+    """Example 6: Simulating a model by id after uploading it once"""
+    kappa_code = """
+%init: 10 A(x[.])
+%init: 10 B(x[.])
+
+%obs: 'AB_complex' |A(x[1]), B(x[1])|
+
+A(x[.]), B(x[.]) <-> A(x[1]), B(x[1]) @ 1, 1
+"""
+
+    model_id = json.loads(register_kappa_model(kappa_code))["model_id"]
+
+    for time_limit in [1.0, 2.0]:
+        result = run_kappa_simulation(
+            kappa_code="",
+            time_limit=time_limit,
+            points=10,
+            seed=42,
+            model_id=model_id
+        )
+        print_result(result, f"Example 6: Uploaded Model (time_limit={time_limit})")
+
+
 def example_invalid_code():
-    """Example 3: Invalid Kappa code (to test error handling)"""
+    """Example 7: Invalid Kappa code (to test error handling)"""
     kappa_code = """
 This is not valid Kappa code!
 """
@@ -91,7 +185,7 @@ This is not valid Kappa code!
         points=10
     )
 
-    print_result(result, "Example 3: Invalid Code (Error Handling)")
+    print_result(result, "Example 7: Invalid Code (Error Handling)")
 
 
 if __name__ == "__main__":
@@ -101,6 +195,10 @@ if __name__ == "__main__":
     # Run examples
     example_simple_binding()
     example_polymerization()
+    example_tau_leap()
+    example_tau_leap_birth_death()
+    example_batch()
+    example_uploaded_model()
     example_invalid_code()
 
     print("\n" + "="*60)